@@ -1,9 +1,11 @@
-from fastapi import FastAPI, HTTPException, Depends
-from sqlmodel import SQLModel, Session, create_engine, select
-from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Depends, Response
+from sqlmodel import SQLModel, Session, create_engine, select, update
+from typing import List, Literal, Optional
 from pydantic import BaseModel
+from sqlalchemy.orm import load_only
+import anyio
 import redis
-import json
+import orjson
 import os
 import sys
 sys.path.insert(0, '/app/shared')
@@ -13,20 +15,74 @@ app = FastAPI(title="Courses Service")
 
 # Database setup
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
+# Connection pool sized for the request concurrency (override with DB_POOL_SIZE / DB_MAX_OVERFLOW)
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    pool_use_lifo=True
+)
 
 # Redis setup
-redis_client = redis.Redis.from_url(os.getenv("REDIS_URL"), decode_responses=True)
+# Values are orjson bytes, so responses are not decoded to str
+redis_client = redis.Redis.from_url(os.getenv("REDIS_URL"))
+
+THREADPOOL_SIZE = 200
 
 # Create tables on startup
 @app.on_event("startup")
 def on_startup():
     SQLModel.metadata.create_all(engine)
+    # Endpoints are sync `def` (run on anyio's threadpool, 40 threads by default).
+    # Raise the limit so blocking DB/Redis calls under a spike queue on the
+    # connection pool instead of starving every other request of a thread.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
 
 def get_session():
     with Session(engine) as session:
         yield session
 
+COURSE_CACHE_TTL = 300
+# Negative-cache marker for missing courses
+COURSE_MISS = b"__miss__"
+COURSE_MISS_TTL = 10
+COURSES_LIST_TTL = 30
+
+# Column order for serialized courses (and the columnar course list)
+COURSE_COLUMNS = (Course.id, Course.name, Course.code, Course.capacity, Course.enrolled, Course.prerequisites)
+COURSE_FIELDS = tuple(column.key for column in COURSE_COLUMNS)
+
+def course_to_dict(course: Course) -> dict:
+    """Plain field read - skips the per-call field walk of .dict()/model_dump()"""
+    return {field: getattr(course, field) for field in COURSE_FIELDS}
+
+def serialize_course(course: Course) -> bytes:
+    """JSON bytes for a course, as stored in the cache"""
+    return orjson.dumps(course_to_dict(course))
+
+def invalidate_course_cache(course_id: Optional[int] = None):
+    """Drop a course's cache entry and the cached course list in one round trip"""
+    # UNLINK frees the values off Redis' main thread (the course list can be large)
+    pipe = redis_client.pipeline(transaction=False)
+    if course_id is not None:
+        pipe.unlink(f"course:{course_id}")
+    pipe.unlink("courses:all", "courses:all:columnar")
+    pipe.execute()
+
+def write_through_course_cache(course: Course):
+    """
+    Store a just-written course in the cache and drop the course list, in one round trip
+
+    Refreshing the entry (instead of deleting it) keeps the next
+    GET /courses/{id} a cache hit.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.setex(f"course:{course.id}", COURSE_CACHE_TTL, serialize_course(course))
+    pipe.unlink("courses:all", "courses:all:columnar")
+    pipe.execute()
+
 # ============ PYDANTIC MODELS ============
 
 class CourseUpdate(BaseModel):
@@ -37,6 +93,10 @@ class CourseUpdate(BaseModel):
     enrolled: Optional[int] = None
     prerequisites: Optional[List[str]] = None
 
+class EnrolledDelta(BaseModel):
+    """Model for atomic enrolled-count adjustments"""
+    delta: int
+
 # ============ ENDPOINTS ============
 
 @app.get("/health")
@@ -45,18 +105,40 @@ def health_check():
     return {"status": "healthy", "service": "courses"}
 
 
-@app.get("/courses", response_model=List[Course])
-def list_courses(session: Session = Depends(get_session)):
+@app.get("/courses", responses={200: {"model": List[Course]}})
+def list_courses(format: Literal["rows", "columnar"] = "rows", session: Session = Depends(get_session)):
     """
-    GET /courses - List all courses
+    GET /courses - List all courses (CACHED)
     Returns: Array of all courses in the catalog
-    No caching (list changes frequently with enrollments)
+
+    GET /courses?format=columnar returns one array per field instead:
+    {"id": [1, 2], "name": [...], "code": [...], "capacity": [...], ...}
+    Field names aren't repeated per row, so the payload is much smaller
+    for callers that scan the whole catalog.
+
+    Cached for 30 seconds and invalidated on every create/update/delete and
+    enrolled-count change, so the short TTL only bounds staleness if an
+    invalidation is ever missed. Both hit and miss return the serialized
+    JSON bytes directly (no response_model re-validation).
     """
-    courses = session.exec(select(Course)).all()
-    return courses
+    cache_key = "courses:all:columnar" if format == "columnar" else "courses:all"
+    cached_data = redis_client.get(cache_key)
+    if cached_data:
+        return Response(content=cached_data, media_type="application/json")
 
+    if format == "columnar":
+        rows = session.exec(select(*COURSE_COLUMNS)).all()
+        payload = orjson.dumps({
+            column.key: [row[i] for row in rows] for i, column in enumerate(COURSE_COLUMNS)
+        })
+    else:
+        courses = session.exec(select(Course)).all()
+        payload = orjson.dumps([course_to_dict(course) for course in courses])
+    redis_client.setex(cache_key, COURSES_LIST_TTL, payload)
+    return Response(content=payload, media_type="application/json")
 
-@app.get("/courses/{course_id}", response_model=Course)
+
+@app.get("/courses/{course_id}", responses={200: {"model": Course}})
 def get_course(course_id: int, session: Session = Depends(get_session)):
     """
     GET /courses/{course_id} - Get course details (CACHED)
@@ -64,24 +146,31 @@ def get_course(course_id: int, session: Session = Depends(get_session)):
     Cache-Aside Pattern:
     1. Check Redis cache first
     2. If cache miss, query database
-    3. Store result in cache (TTL: 300 seconds)
+    3. Store result in cache (TTL: 300 seconds; missing courses: 10 seconds)
     4. Return course
 
     Why cache? High read volume during enrollment, course details rarely change
+
+    Hits return the cached JSON bytes as-is.
     """
     # Try to get from Redis cache first
     cached_data = redis_client.get(f"course:{course_id}")
+    if cached_data == COURSE_MISS:
+        raise HTTPException(status_code=404, detail="Course not found")
     if cached_data:
-        return json.loads(cached_data)
+        return Response(content=cached_data, media_type="application/json")
 
     # Cache miss - query database
     course = session.get(Course, course_id)
     if not course:
+        # Negative cache: short TTL, and overwritten if the course gets created
+        redis_client.setex(f"course:{course_id}", COURSE_MISS_TTL, COURSE_MISS)
         raise HTTPException(status_code=404, detail="Course not found")
 
-    # Store in Redis cache with 300 second TTL
-    redis_client.setex(f"course:{course_id}", 300, json.dumps(course.dict()))
-    return course
+    # Serialize once, store in Redis cache with 300 second TTL
+    payload = serialize_course(course)
+    redis_client.setex(f"course:{course_id}", COURSE_CACHE_TTL, payload)
+    return Response(content=payload, media_type="application/json")
 
 
 @app.post("/courses", response_model=Course, status_code=201)
@@ -102,6 +191,10 @@ def create_course(course: Course, session: Session = Depends(get_session)):
     session.add(course)
     session.commit()
     session.refresh(course)
+
+    # Cache the new course (replacing any not-found marker) and drop the cached list
+    write_through_course_cache(course)
+
     return course
 
 
@@ -115,13 +208,13 @@ def update_course(
     PUT /courses/{course_id} - Update course details (partial updates supported)
 
     Used to:
-    - Update enrolled count when student enrolls
     - Update capacity
     - Update prerequisites
 
     All fields are optional - only provided fields will be updated.
+    Enrollment changes go through POST /courses/{course_id}/enrolled/increment instead.
 
-    IMPORTANT: Invalidate cache after update
+    IMPORTANT: Refresh cache after update (write-through)
     """
     course = session.get(Course, course_id)
     if not course:
@@ -136,8 +229,57 @@ def update_course(
     session.commit()
     session.refresh(course)
 
+    # Refresh cache with the updated row
+    write_through_course_cache(course)
+
+    return course
+
+
+@app.post("/courses/{course_id}/enrolled/increment", response_model=Course)
+def increment_enrolled(
+    course_id: int,
+    change: EnrolledDelta,
+    session: Session = Depends(get_session)
+):
+    """
+    POST /courses/{course_id}/enrolled/increment - Atomically adjust enrolled count
+
+    Request body:
+    {
+        "delta": 1      # negative to release seats
+    }
+
+    Runs a single UPDATE ... RETURNING instead of GET + PUT, so concurrent
+    enrollments can't lose updates, and the WHERE clause enforces capacity.
+
+    Returns: Updated course, 404 if missing, 409 if the change would push
+    enrolled above capacity or below zero
+
+    IMPORTANT: Invalidate cache after update. Concurrent increments can finish
+    their cache writes out of order, so writing the RETURNING row through could
+    leave an older enrolled count cached; the next read reloads it instead.
+    """
+    new_enrolled = Course.enrolled + change.delta
+    course = session.exec(
+        update(Course)
+        .where(Course.id == course_id, new_enrolled >= 0, new_enrolled <= Course.capacity)
+        .values(enrolled=new_enrolled)
+        .returning(Course)
+    ).scalar_one_or_none()
+    if course is not None:
+        # Detach first so commit doesn't expire the RETURNING values (no extra SELECT)
+        session.expunge(course)
+    session.commit()
+
+    if course is None:
+        # Only need to know whether the row exists
+        if session.get(Course, course_id, options=[load_only(Course.id)]) is None:
+            raise HTTPException(status_code=404, detail="Course not found")
+        detail = "Course is full" if change.delta > 0 else "Enrolled count cannot go below zero"
+        raise HTTPException(status_code=409, detail=detail)
+
     # Invalidate cache
-    redis_client.delete(f"course:{course_id}")
+    invalidate_course_cache(course_id)
 
     return course
 
@@ -149,7 +291,8 @@ def delete_course(course_id: int, session: Session = Depends(get_session)):
 
     IMPORTANT: Invalidate cache after deletion
     """
-    course = session.get(Course, course_id)
+    # Deleting only needs the primary key, not the full row
+    course = session.get(Course, course_id, options=[load_only(Course.id)])
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
 
@@ -157,6 +300,6 @@ def delete_course(course_id: int, session: Session = Depends(get_session)):
     session.commit()
 
     # Invalidate cache
-    redis_client.delete(f"course:{course_id}")
+    invalidate_course_cache(course_id)
 
     return None
\ No newline at end of file
@@ -1,43 +1,156 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
-from sqlmodel import SQLModel, Session, create_engine, select
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy import text
 from typing import List, Optional
 from pydantic import BaseModel
+import asyncio
+import httpx
 import pika
-import json
+import redis.asyncio as redis
+import orjson
 import os
-import requests
 import threading
 import sys
 sys.path.insert(0, '/app/shared')
 from shared.models import Enrollment
+from queueing import ENROLLMENT_QUEUE, HTTP_LIMITS, HTTP_RETRIES, get_rabbitmq_channel
 
 app = FastAPI(title="Enrollment Service")
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
+# Async (asyncpg) connection pool sized for the request concurrency
+# (override with DB_POOL_SIZE / DB_MAX_OVERFLOW)
+engine = create_async_engine(
+    DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1),
+    pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    pool_use_lifo=True
+)
+async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
-# RabbitMQ setup
-RABBITMQ_URL = os.getenv("RABBITMQ_URL")
 COURSES_SERVICE = os.getenv("COURSES_SERVICE_URL")
 STUDENTS_SERVICE = os.getenv("STUDENTS_SERVICE_URL")
 
+# Redis holds short-lived enrollment validation results (values are bytes)
+redis_client = redis.Redis.from_url(os.getenv("REDIS_URL"))
+ENROLL_CHECK_TTL = 10
+
+http_client = httpx.AsyncClient(
+    timeout=5,
+    transport=httpx.AsyncHTTPTransport(limits=HTTP_LIMITS, retries=HTTP_RETRIES)
+)
+
 @app.on_event("startup")
-def on_startup():
-    SQLModel.metadata.create_all(engine)
-    # Start RabbitMQ consumer in background thread
-    consumer_thread = threading.Thread(target=start_consumer, daemon=True)
-    consumer_thread.start()
-
-def get_session():
-    with Session(engine) as session:
+async def on_startup():
+    async with engine.begin() as conn:
+        # The worker creates the same tables at startup; the advisory lock stops them racing
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("SELECT pg_advisory_xact_lock(8003)"))
+        await conn.run_sync(SQLModel.metadata.create_all)
+    # Open the publisher connection up front so the first enrollment doesn't pay for it
+    await run_in_threadpool(open_publisher)
+    # Queued enrollments are processed by the separate worker process (worker.py)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await http_client.aclose()
+    await redis_client.aclose()
+    with _publish_lock:
+        _reset_publisher()
+    await engine.dispose()
+
+async def get_session():
+    async with async_session() as session:
         yield session
 
-def get_rabbitmq_channel():
-    """Create RabbitMQ connection and channel"""
-    connection = pika.BlockingConnection(pika.URLParameters(RABBITMQ_URL))
-    channel = connection.channel()
-    channel.queue_declare(queue='enrollments', durable=True)
-    return connection, channel
+# Long-lived publisher connection, reused across requests and rebuilt if the broker drops it.
+# BlockingConnection is not thread-safe, so every use is guarded by _publish_lock.
+_publish_lock = threading.Lock()
+_publisher_connection = None
+_publisher_channel = None
+
+def _get_publisher_channel():
+    """Return the shared publisher channel, (re)connecting if needed. Caller must hold _publish_lock."""
+    global _publisher_connection, _publisher_channel
+    if _publisher_connection is None or _publisher_connection.is_closed or _publisher_channel.is_closed:
+        _publisher_connection, _publisher_channel = get_rabbitmq_channel()
+    return _publisher_channel
+
+def _reset_publisher():
+    """Drop the shared publisher connection. Caller must hold _publish_lock."""
+    global _publisher_connection, _publisher_channel
+    if _publisher_connection is not None and _publisher_connection.is_open:
+        try:
+            _publisher_connection.close()
+        except pika.exceptions.AMQPError:
+            pass
+    _publisher_connection = None
+    _publisher_channel = None
+
+def open_publisher():
+    """Connect the shared publisher channel (blocking)"""
+    with _publish_lock:
+        _get_publisher_channel()
+
+def publish_enrollment(message: bytes):
+    """Publish an enrollment message (blocking - call via the threadpool from async code)"""
+    with _publish_lock:
+        for attempt in range(2):
+            try:
+                _get_publisher_channel().basic_publish(
+                    exchange='',
+                    routing_key=ENROLLMENT_QUEUE,
+                    body=message,
+                    properties=pika.BasicProperties(delivery_mode=2)  # persistent
+                )
+                return
+            except pika.exceptions.AMQPError as e:
+                # Connection went stale (e.g. missed heartbeats while idle) - reconnect and retry once
+                _reset_publisher()
+                if attempt:
+                    raise
+                print(f"Publisher connection lost ({e!r}), reconnecting...")
+
+async def is_enrolled(student_id: int, course_id: int) -> bool:
+    """Check for an existing enrollment (unique index lookup)"""
+    async with async_session() as session:
+        result = await session.exec(
+            select(Enrollment.id).where(
+                Enrollment.student_id == student_id,
+                Enrollment.course_id == course_id
+            )
+        )
+        existing = result.first()
+    return existing is not None
+
+def unwrap_service_response(result, detail: str) -> dict:
+    """Return the JSON body of a gathered inter-service call, mapping HTTP failures to 404"""
+    if isinstance(result, httpx.HTTPError):
+        raise HTTPException(status_code=404, detail=detail)
+    if isinstance(result, BaseException):
+        raise result
+    if result.is_error:
+        raise HTTPException(status_code=404, detail=detail)
+    return orjson.loads(result.content)
+
+async def remember_rejection(check_key: str, error: HTTPException):
+    """Cache a validation failure so identical retries are rejected with a single GET"""
+    await redis_client.setex(check_key, ENROLL_CHECK_TTL, f"fail:{error.status_code}:{error.detail}")
+
+async def unwrap_lookup(result, detail: str, check_key: str) -> dict:
+    """unwrap_service_response, remembering definite 404s (not timeouts or 5xx)"""
+    try:
+        return unwrap_service_response(result, detail)
+    except HTTPException as e:
+        if isinstance(result, httpx.Response) and result.status_code == 404:
+            await remember_rejection(check_key, e)
+        raise
 
 # ============ PYDANTIC MODELS FOR REQUESTS ============
 
@@ -61,7 +174,7 @@ def health_check():
 
 
 @app.post("/enroll", response_model=EnrollmentResponse, status_code=202)
-def enroll_student(request: EnrollmentRequest):
+async def enroll_student(request: EnrollmentRequest):
     """
     POST /enroll - Enroll a student in a course (ASYNC via RabbitMQ)
 
@@ -72,8 +185,12 @@ def enroll_student(request: EnrollmentRequest):
     }
 
     Process:
-    1. Fetch student from Students Service (inter-service communication)
-    2. Fetch course from Courses Service (inter-service communication)
+    0. Check for a recent validation result for this (student, course) pair:
+       a cached failure (404 or unmet prerequisites) is returned straight away,
+       a cached "ok" skips the student lookup and prerequisite check (TTL: 10 seconds)
+    1-2. Fetch student and course concurrently from the Students and Courses Services
+         (and check for an existing enrollment in our own DB at the same time).
+         The student fetch is skipped when their student:{id}:completed set is in Redis
     3. Validate prerequisites: Check if all course.prerequisites are in student.completed_courses
     4. Validate capacity: Check if course.enrolled < course.capacity
     5. If valid, publish message to RabbitMQ queue
@@ -86,42 +203,57 @@ def enroll_student(request: EnrollmentRequest):
     - Prevents blocking during high traffic
     - Demonstrates resilience to spikes
     """
-    # 1. Fetch student from Students Service
-    try:
-        student_response = requests.get(f"{STUDENTS_SERVICE}/students/{request.student_id}")
-        student_response.raise_for_status()
-        student = student_response.json()
-    except requests.exceptions.RequestException:
-        raise HTTPException(status_code=404, detail="Student not found")
-
-    # 2. Fetch course from Courses Service
-    try:
-        course_response = requests.get(f"{COURSES_SERVICE}/courses/{request.course_id}")
-        course_response.raise_for_status()
-        course = course_response.json()
-    except requests.exceptions.RequestException:
-        raise HTTPException(status_code=404, detail="Course not found")
+    # 0. Recent validation result, plus the student's completed courses if the
+    #    Students Service has mirrored them into a Redis set (one round trip)
+    check_key = f"enroll_check:{request.student_id}:{request.course_id}"
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.get(check_key)
+    pipe.smembers(f"student:{request.student_id}:completed")
+    cached_check, completed_members = await pipe.execute()
+    if cached_check is not None and cached_check.startswith(b"fail:"):
+        status_code, detail = cached_check[5:].decode().split(":", 1)
+        raise HTTPException(status_code=int(status_code), detail=detail)
+    prereqs_verified = cached_check == b"ok"
+    completed = frozenset(member.decode() for member in completed_members) if completed_members else None
+    need_student = not prereqs_verified and completed is None
+
+    # 1-2. Fetch student and course concurrently (two RTTs overlap into one)
+    lookups = [
+        http_client.get(f"{COURSES_SERVICE}/courses/{request.course_id}"),
+        is_enrolled(request.student_id, request.course_id)
+    ]
+    if need_student:
+        lookups.append(http_client.get(f"{STUDENTS_SERVICE}/students/{request.student_id}"))
+    course_result, already_enrolled, *student_result = await asyncio.gather(*lookups, return_exceptions=True)
+    if need_student:
+        student = await unwrap_lookup(student_result[0], "Student not found", check_key)
+        completed = frozenset(student.get("completed_courses", ()))
+    course = await unwrap_lookup(course_result, "Course not found", check_key)
+    if isinstance(already_enrolled, BaseException):
+        raise already_enrolled
+    if already_enrolled:
+        raise HTTPException(status_code=400, detail="Student is already enrolled in this course")
 
     # 3. Validate prerequisites
-    required = course.get("prerequisites", [])
-    completed = student.get("completed_courses", [])
-
-    print(f"[DEBUG] Validating prerequisites for student {request.student_id} enrolling in course {request.course_id}")
-    print(f"[DEBUG] Required prerequisites: {required}")
-    print(f"[DEBUG] Student completed courses: {completed}")
-
-    # Check each prerequisite individually for better debugging
-    missing_prereqs = []
-    for prereq in required:
-        if prereq not in completed:
-            missing_prereqs.append(prereq)
-
-    if missing_prereqs:
-        error_msg = f"Prerequisites not met. Missing: {', '.join(missing_prereqs)}"
-        print(f"[DEBUG] Prerequisite validation FAILED: {error_msg}")
-        raise HTTPException(status_code=400, detail=error_msg)
-
-    print(f"[DEBUG] Prerequisite validation PASSED")
+    if not prereqs_verified:
+        required = course.get("prerequisites", [])
+
+        print(f"[DEBUG] Validating prerequisites for student {request.student_id} enrolling in course {request.course_id}")
+        print(f"[DEBUG] Required prerequisites: {required}")
+        print(f"[DEBUG] Student completed courses: {sorted(completed)}")
+
+        # One hashed subset check (O(N+M)) instead of a list scan per prerequisite;
+        # the missing list is only built when the check fails
+        if not completed.issuperset(required):
+            missing_prereqs = [prereq for prereq in required if prereq not in completed]
+            error_msg = f"Prerequisites not met. Missing: {', '.join(missing_prereqs)}"
+            print(f"[DEBUG] Prerequisite validation FAILED: {error_msg}")
+            error = HTTPException(status_code=400, detail=error_msg)
+            await remember_rejection(check_key, error)
+            raise error
+
+        print(f"[DEBUG] Prerequisite validation PASSED")
+        await redis_client.setex(check_key, ENROLL_CHECK_TTL, b"ok")
 
     # 4. Validate capacity
     if course["enrolled"] >= course["capacity"]:
@@ -130,16 +262,9 @@ def enroll_student(request: EnrollmentRequest):
 
     print(f"[DEBUG] Capacity validation PASSED: {course['enrolled']}/{course['capacity']}")
 
-    # 5. Publish to RabbitMQ
-    connection, channel = get_rabbitmq_channel()
-    message = json.dumps({"student_id": request.student_id, "course_id": request.course_id})
-    channel.basic_publish(
-        exchange='',
-        routing_key='enrollments',
-        body=message,
-        properties=pika.BasicProperties(delivery_mode=2)  # persistent
-    )
-    connection.close()
+    # 5. Publish to RabbitMQ (pika is blocking, so keep it off the event loop)
+    message = orjson.dumps({"student_id": request.student_id, "course_id": request.course_id})
+    await run_in_threadpool(publish_enrollment, message)
 
     # 6. Return 202 Accepted
     return EnrollmentResponse(
@@ -148,30 +273,65 @@ def enroll_student(request: EnrollmentRequest):
     )
 
 
-@app.get("/enrollments", response_model=List[Enrollment])
-def list_enrollments(session: Session = Depends(get_session)):
+# Columns selected for read endpoints (rows are serialized without building ORM objects)
+ENROLLMENT_COLUMNS = (Enrollment.id, Enrollment.student_id, Enrollment.course_id)
+
+def enrollment_rows_response(rows) -> Response:
+    """
+    Serialize enrollment rows straight from the DB cursor
+
+    Rows come from our own database, so there is nothing to validate: skip ORM
+    object hydration and response_model validation and hand orjson plain dicts
+    """
+    return Response(
+        content=orjson.dumps([row._asdict() for row in rows]),
+        media_type="application/json"
+    )
+
+
+@app.get("/enrollments", responses={200: {"model": List[Enrollment]}})
+async def list_enrollments(session: AsyncSession = Depends(get_session)):
     """
     GET /enrollments - List all enrollments
     Returns: Array of all enrollment records
     """
-    enrollments = session.exec(select(Enrollment)).all()
-    return enrollments
+    result = await session.exec(select(*ENROLLMENT_COLUMNS))
+    rows = result.all()
+    return enrollment_rows_response(rows)
 
 
-@app.get("/enrollments/student/{student_id}", response_model=List[Enrollment])
-def get_student_enrollments(student_id: int, session: Session = Depends(get_session)):
+async def stream_enrollment_rows(statement):
+    """
+    Yield a JSON array of enrollment rows, 200 rows at a time from a server-side cursor
+
+    Opens its own session: the generator runs while the response is being sent.
+    """
+    async with async_session() as session:
+        result = await session.stream(statement.execution_options(yield_per=200))
+        yield b"["
+        separator = b""
+        async for rows in result.partitions():
+            yield separator + b",".join(orjson.dumps(row._asdict()) for row in rows)
+            separator = b","
+        yield b"]"
+
+
+@app.get("/enrollments/student/{student_id}", responses={200: {"model": List[Enrollment]}})
+async def get_student_enrollments(student_id: int):
     """
     GET /enrollments/student/{student_id} - Get all enrollments for a student
     Returns: Array of enrollments for the specified student
+
+    Streamed: memory stays bounded for students with long histories, and
+    encoding overlaps with fetching the next chunk.
     """
-    enrollments = session.exec(
-        select(Enrollment).where(Enrollment.student_id == student_id)
-    ).all()
-    return enrollments
+    # Index-only scan on ix_enrollment_student_course
+    statement = select(*ENROLLMENT_COLUMNS).where(Enrollment.student_id == student_id)
+    return StreamingResponse(stream_enrollment_rows(statement), media_type="application/json")
 
 
 @app.delete("/enrollments/{enrollment_id}", status_code=204)
-def drop_enrollment(enrollment_id: int, session: Session = Depends(get_session)):
+async def drop_enrollment(enrollment_id: int, session: AsyncSession = Depends(get_session)):
     """
     DELETE /enrollments/{enrollment_id} - Drop a course (delete enrollment)
 
@@ -179,97 +339,24 @@ def drop_enrollment(enrollment_id: int, session: Session = Depends(get_session))
     1. Delete enrollment record
     2. Update course enrolled count (call Courses Service PUT endpoint)
     """
-    # 1. Get enrollment from database
-    enrollment = session.get(Enrollment, enrollment_id)
+    enrollment = await session.get(Enrollment, enrollment_id)
     if not enrollment:
         raise HTTPException(status_code=404, detail="Enrollment not found")
 
-    # 2. Get course_id from enrollment
+    # 1. Delete enrollment record
     course_id = enrollment.course_id
+    await session.delete(enrollment)
+    await session.commit()
 
-    # 3. Delete enrollment
-    session.delete(enrollment)
-    session.commit()
-
-    # 4. Update course enrolled count (decrement by 1)
+    # 2. Release the seat (atomic decrement in the Courses Service)
     try:
-        # First get the current course data
-        course_response = requests.get(f"{COURSES_SERVICE}/courses/{course_id}")
-        course_response.raise_for_status()
-        course = course_response.json()
-
-        # Then update with decremented enrolled count
-        requests.put(
-            f"{COURSES_SERVICE}/courses/{course_id}",
-            json={"enrolled": course["enrolled"] - 1}
+        response = await http_client.post(
+            f"{COURSES_SERVICE}/courses/{course_id}/enrolled/increment",
+            json={"delta": -1}
         )
-    except requests.exceptions.RequestException:
+        response.raise_for_status()
+    except httpx.HTTPError as e:
         # Log the error but don't fail the deletion
-        pass
+        print(f"Error releasing seat in course {course_id}: {e}")
 
     return None
-
-
-# ============ RABBITMQ CONSUMER (Background Worker) ============
-
-def process_enrollment_message(ch, method, properties, body):
-    """
-    RabbitMQ consumer callback - processes enrollment messages from queue
-
-    This runs in a background thread and processes queued enrollments
-
-    Process:
-    1. Parse message
-    2. Create enrollment record in database
-    3. Update course enrolled count via Courses Service
-    4. Acknowledge message
-    """
-    try:
-        # 1. Parse message
-        data = json.loads(body)
-        print(f"Processing enrollment: student_id={data['student_id']}, course_id={data['course_id']}")
-
-        # 2. Create enrollment record in database
-        with Session(engine) as session:
-            enrollment = Enrollment(
-                student_id=data["student_id"],
-                course_id=data["course_id"]
-            )
-            session.add(enrollment)
-            session.commit()
-            print(f"Created enrollment record with ID: {enrollment.id}")
-
-        # 3. Update course enrolled count (increment by 1)
-        try:
-            course_response = requests.get(f"{COURSES_SERVICE}/courses/{data['course_id']}")
-            course_response.raise_for_status()
-            course = course_response.json()
-
-            requests.put(
-                f"{COURSES_SERVICE}/courses/{data['course_id']}",
-                json={"enrolled": course["enrolled"] + 1}
-            )
-            print(f"Updated course {data['course_id']} enrolled count to {course['enrolled'] + 1}")
-        except requests.exceptions.RequestException as e:
-            print(f"Error updating course enrolled count: {e}")
-
-        # 4. Acknowledge message
-        ch.basic_ack(delivery_tag=method.delivery_tag)
-        print("Enrollment processed successfully")
-
-    except Exception as e:
-        print(f"Error processing enrollment message: {e}")
-        # Reject message and requeue
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
-
-
-def start_consumer():
-    """Start RabbitMQ consumer in background thread"""
-    connection, channel = get_rabbitmq_channel()
-    channel.basic_qos(prefetch_count=1)
-    channel.basic_consume(
-        queue='enrollments',
-        on_message_callback=process_enrollment_message
-    )
-    print("Starting RabbitMQ consumer...")
-    channel.start_consuming()
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+Queue topology and inter-service HTTP settings shared by the API (main.py)
+and the queue consumer (worker.py)
+
+Kept free of the API's engine and clients so the worker can import it
+without building them.
+"""
+import httpx
+import pika
+import os
+
+RABBITMQ_URL = os.getenv("RABBITMQ_URL")
+
+# Pooled HTTP clients for inter-service calls (keep-alive connections are reused).
+# Connection failures (e.g. a replica restarting) are retried; requests that reached
+# the server are not, since the seat-counter POSTs aren't idempotent.
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+HTTP_RETRIES = 2
+
+# Messages the worker can't process are retried after a growing delay (a TTL'd
+# retry queue per attempt that dead-letters back into the main queue), and land
+# in the dead-letter queue once the retries run out
+ENROLLMENT_QUEUE = 'enrollments'
+DEAD_LETTER_EXCHANGE = 'enrollments.dlx'
+DEAD_LETTER_QUEUE = 'enrollments.dlq'
+RETRY_DELAYS_MS = (1000, 5000, 25000)
+
+def retry_queue_name(attempt: int) -> str:
+    """Name of the delay queue for the given retry attempt (1-based)"""
+    return f"{ENROLLMENT_QUEUE}.retry.{attempt}"
+
+def get_rabbitmq_channel():
+    """Create RabbitMQ connection and channel"""
+    connection = pika.BlockingConnection(pika.URLParameters(RABBITMQ_URL))
+    channel = connection.channel()
+    channel.exchange_declare(exchange=DEAD_LETTER_EXCHANGE, exchange_type='fanout', durable=True)
+    channel.queue_declare(queue=DEAD_LETTER_QUEUE, durable=True)
+    channel.queue_bind(queue=DEAD_LETTER_QUEUE, exchange=DEAD_LETTER_EXCHANGE)
+    channel.queue_declare(
+        queue=ENROLLMENT_QUEUE,
+        durable=True,
+        arguments={'x-dead-letter-exchange': DEAD_LETTER_EXCHANGE}
+    )
+    for attempt, delay in enumerate(RETRY_DELAYS_MS, start=1):
+        channel.queue_declare(
+            queue=retry_queue_name(attempt),
+            durable=True,
+            arguments={
+                'x-message-ttl': delay,
+                'x-dead-letter-exchange': '',
+                'x-dead-letter-routing-key': ENROLLMENT_QUEUE
+            }
+        )
+    return connection, channel
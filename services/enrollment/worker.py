@@ -0,0 +1,278 @@
+"""
+Enrollment Worker - consumes queued enrollments from RabbitMQ
+
+Runs as its own process/container (see docker-compose.yml) so queue
+processing never competes with the API for the GIL or the event loop.
+Scale it independently: docker-compose up --scale enrollment-worker=3
+
+Usage: python worker.py
+"""
+from sqlmodel import SQLModel, Session, create_engine
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import text
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+import httpx
+import orjson
+import pika
+import time
+import sys
+import os
+sys.path.insert(0, '/app/shared')
+from shared.models import Enrollment
+from queueing import (
+    HTTP_LIMITS, HTTP_RETRIES, ENROLLMENT_QUEUE, RETRY_DELAYS_MS,
+    get_rabbitmq_channel, retry_queue_name
+)
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+COURSES_SERVICE = os.getenv("COURSES_SERVICE_URL")
+
+# The worker only needs a handful of connections (one bulk insert per batch)
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "5")),
+    pool_pre_ping=True,
+    pool_recycle=1800
+)
+
+# Thread-safe pooled client shared by the seat-reservation threads
+http_client = httpx.Client(
+    timeout=5,
+    transport=httpx.HTTPTransport(limits=HTTP_LIMITS, retries=HTTP_RETRIES)
+)
+
+# Messages are drained in batches: up to CONSUMER_BATCH_SIZE, or whatever arrived
+# within CONSUMER_FLUSH_INTERVAL seconds of the first message in the batch
+CONSUMER_BATCH_SIZE = 50
+CONSUMER_FLUSH_INTERVAL = 0.05
+
+# Course groups within a batch are independent, so their seat reservations run in parallel
+executor = ThreadPoolExecutor(max_workers=8)
+
+
+def change_enrolled(course_id: int, delta: int) -> httpx.Response:
+    """Atomically adjust a course's enrolled count via the Courses Service"""
+    return http_client.post(
+        f"{COURSES_SERVICE}/courses/{course_id}/enrolled/increment",
+        json={"delta": delta}
+    )
+
+
+# Why reserve_seats stopped short of the whole group
+SEATS_FULL = "is full"
+COURSE_GONE = "no longer exists"
+RESERVE_ERROR = "could not be reached"
+
+
+def reserve_seats(course_id: int, count: int) -> Tuple[int, Optional[str]]:
+    """
+    Take up to `count` seats in a course, returning (seats granted, reason the rest weren't)
+
+    Tries the whole group in one atomic increment; if the course can't fit
+    all of them (409), falls back to one seat at a time until it is full.
+    The reason is None when every seat was granted, SEATS_FULL, COURSE_GONE
+    (404), or RESERVE_ERROR for any other status or HTTP error - seats granted
+    before the error are kept, and only the rest should be retried.
+    """
+    try:
+        response = change_enrolled(course_id, count)
+    except httpx.HTTPError as e:
+        print(f"Error reserving seats in course {course_id}: {e}")
+        return 0, RESERVE_ERROR
+    if response.status_code == 200:
+        return count, None
+    if response.status_code == 404:
+        return 0, COURSE_GONE
+    if response.status_code != 409:
+        print(f"Error reserving seats in course {course_id}: HTTP {response.status_code}")
+        return 0, RESERVE_ERROR
+
+    granted = 0
+    while granted < count:
+        try:
+            response = change_enrolled(course_id, 1)
+        except httpx.HTTPError as e:
+            print(f"Error reserving seats in course {course_id}: {e}")
+            return granted, RESERVE_ERROR
+        if response.status_code == 409:
+            return granted, SEATS_FULL
+        if response.status_code == 404:
+            return granted, COURSE_GONE
+        if response.status_code != 200:
+            print(f"Error reserving seats in course {course_id}: HTTP {response.status_code}")
+            return granted, RESERVE_ERROR
+        granted += 1
+    return granted, None
+
+
+def release_seats(course_counts: Counter):
+    """Best-effort hand-back of reserved seats (e.g. after a failed or duplicate insert)"""
+    for course_id, count in course_counts.items():
+        try:
+            change_enrolled(course_id, -count)
+        except httpx.HTTPError as e:
+            print(f"Error releasing {count} seat(s) in course {course_id}: {e}")
+
+
+def reserve_course_group(course_id: int, items: List[Tuple[int, dict]]):
+    """
+    Reserve seats for one course's messages
+
+    Runs on the executor, so it must not touch the (non thread-safe) channel.
+    Returns (granted items, rejected delivery tags, failed delivery tags).
+    """
+    granted, reason = reserve_seats(course_id, len(items))
+    if reason == RESERVE_ERROR:
+        # Seats already granted are kept; only the rest go back for a retry
+        return items[:granted], [], [tag for tag, _ in items[granted:]]
+
+    rejected = []
+    for tag, data in items[granted:]:
+        print(f"Rejected enrollment: course {course_id} {reason} (student_id={data['student_id']})")
+        rejected.append(tag)
+    return items[:granted], rejected, []
+
+
+def insert_enrollments(items: List[Tuple[int, dict]]) -> set:
+    """
+    Insert all granted enrollments in one multi-row INSERT and one commit
+
+    ON CONFLICT DO NOTHING skips (student, course) pairs that already exist,
+    so one duplicate can't fail the whole batch. Returns the pairs inserted.
+    """
+    rows = [{"student_id": data["student_id"], "course_id": data["course_id"]} for _, data in items]
+    with Session(engine) as session:
+        inserted = session.exec(
+            insert(Enrollment)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["student_id", "course_id"])
+            .returning(Enrollment.student_id, Enrollment.course_id)
+        ).all()
+        session.commit()
+    return {tuple(row) for row in inserted}
+
+
+def retry_or_dead_letter(ch, method, properties, body) -> bool:
+    """
+    Schedule a failed message for a delayed retry, or dead-letter it once retries run out
+
+    Returns True if the message was re-published (the original still needs acking).
+    """
+    retries = (properties.headers or {}).get("x-retry-count", 0)
+    if retries >= len(RETRY_DELAYS_MS):
+        print(f"Dead-lettering enrollment after {retries} retries: {body!r}")
+        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+        return False
+
+    ch.basic_publish(
+        exchange='',
+        routing_key=retry_queue_name(retries + 1),
+        body=body,
+        properties=pika.BasicProperties(delivery_mode=2, headers={"x-retry-count": retries + 1})
+    )
+    print(f"Retrying enrollment in {RETRY_DELAYS_MS[retries]}ms (attempt {retries + 1})")
+    return True
+
+
+def process_enrollment_batch(ch, batch):
+    """
+    Processes a batch of enrollment messages drained from the queue
+
+    Process:
+    1. Parse messages and group them by course
+    2. Reserve seats per course (in parallel) with one atomic increment each;
+       capacity is enforced by the Courses Service, so concurrent enrollments
+       can't over-fill a course
+    3. Insert every enrollment that got a seat in a single statement, handing
+       seats back for duplicates
+    4. Acknowledge the batch. Messages that hit a transient error (Courses
+       Service or database unavailable) go to a delayed retry queue; malformed
+       ones, and those out of retries, are dead-lettered
+    """
+    # 1. Parse messages
+    messages = {method.delivery_tag: (method, properties, body) for method, properties, body in batch}
+    by_course: Dict[int, List[Tuple[int, dict]]] = defaultdict(list)
+    handled, failed, malformed = [], [], []
+    for tag, (method, properties, body) in messages.items():
+        try:
+            data = orjson.loads(body)
+            print(f"Processing enrollment: student_id={data['student_id']}, course_id={data['course_id']}")
+            by_course[data["course_id"]].append((tag, data))
+        except Exception as e:
+            print(f"Error processing enrollment message: {e}")
+            malformed.append(tag)
+
+    # 2. Reserve seats, course groups in parallel
+    granted = []
+    for group_granted, group_rejected, group_failed in executor.map(
+        lambda group: reserve_course_group(*group), by_course.items()
+    ):
+        granted.extend(group_granted)
+        handled.extend(group_rejected)
+        failed.extend(group_failed)
+
+    # 3. Bulk insert
+    if granted:
+        try:
+            inserted = insert_enrollments(granted)
+            print(f"Created {len(inserted)} enrollment record(s)")
+            duplicates = Counter()
+            for tag, data in granted:
+                pair = (data["student_id"], data["course_id"])
+                if pair in inserted:
+                    inserted.discard(pair)
+                else:
+                    print(f"Skipped duplicate enrollment: student_id={pair[0]}, course_id={pair[1]}")
+                    duplicates[pair[1]] += 1
+                handled.append(tag)
+            release_seats(duplicates)
+        except Exception as e:
+            print(f"Error inserting enrollment batch: {e}")
+            release_seats(Counter(data["course_id"] for _, data in granted))
+            failed.extend(tag for tag, _ in granted)
+
+    # 4. Settle failures first, then ack everything else up to the newest tag in one frame
+    for tag in malformed:
+        ch.basic_nack(delivery_tag=tag, requeue=False)
+    for tag in failed:
+        if retry_or_dead_letter(ch, *messages[tag]):
+            handled.append(tag)
+    if handled:
+        ch.basic_ack(delivery_tag=max(handled), multiple=True)
+        print(f"Enrollment batch processed: {len(handled)} handled, {len(failed)} failed")
+
+
+def start_consumer():
+    """Consume the enrollments queue, flushing batches to process_enrollment_batch"""
+    connection, channel = get_rabbitmq_channel()
+    channel.basic_qos(prefetch_count=CONSUMER_BATCH_SIZE)
+    print("Starting RabbitMQ consumer...")
+
+    batch = []
+    flush_at = None
+    # consume() yields (None, None, None) after CONSUMER_FLUSH_INTERVAL of inactivity
+    for method, properties, body in channel.consume(
+        queue=ENROLLMENT_QUEUE,
+        inactivity_timeout=CONSUMER_FLUSH_INTERVAL
+    ):
+        if method is not None:
+            batch.append((method, properties, body))
+            if flush_at is None:
+                flush_at = time.monotonic() + CONSUMER_FLUSH_INTERVAL
+
+        if batch and (len(batch) >= CONSUMER_BATCH_SIZE or method is None or time.monotonic() >= flush_at):
+            process_enrollment_batch(channel, batch)
+            batch = []
+            flush_at = None
+
+
+if __name__ == "__main__":
+    with engine.begin() as conn:
+        # Same lock as the API's startup, which creates these tables too
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(8003)"))
+        SQLModel.metadata.create_all(conn)
+    start_consumer()
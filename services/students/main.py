@@ -1,30 +1,258 @@
-from fastapi import FastAPI, HTTPException, Depends
-from sqlmodel import SQLModel, Session, create_engine, select
-from typing import List, Optional
-from pydantic import BaseModel
-import redis
-import json
+from fastapi import FastAPI, HTTPException, Depends, Response, BackgroundTasks
+from fastapi.responses import ORJSONResponse
+from sqlmodel import SQLModel, select, update, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy import text
+from typing import Dict, List, Optional
+from pydantic import BaseModel, TypeAdapter
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from cachetools import TTLCache
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, make_asgi_app, multiprocess
+import zstandard as zstd
+import asyncio
 import sys
 import os
 
 sys.path.insert(0, '/app/shared')
 from shared.models import Student
 
-app = FastAPI(title="Students Service")
+app = FastAPI(title="Students Service", default_response_class=ORJSONResponse)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
-
-redis_client = redis.Redis.from_url(os.getenv("REDIS_URL"), decode_responses=True)
+# Async (asyncpg) connection pool; override its size with DB_POOL_SIZE / DB_MAX_OVERFLOW
+engine = create_async_engine(
+    DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1),
+    pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "40")),
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    pool_timeout=5
+)
+async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+# One-pass (Rust) JSON serializer, built once at import instead of .dict() + encode per call
+STUDENT_ADAPTER = TypeAdapter(Student)
+
+# Values are JSON bytes, so responses are not decoded to str.
+# One bounded, shared Redis pool (override with REDIS_POOL). Blocking, so a burst beyond
+# the limit waits for a free connection instead of erroring with "Too many connections"
+redis_pool = aioredis.BlockingConnectionPool.from_url(
+    os.getenv("REDIS_URL"),
+    max_connections=int(os.getenv("REDIS_POOL", "64")),
+    timeout=5,
+    socket_keepalive=True,
+    health_check_interval=30
+)
+redis_client = aioredis.Redis(connection_pool=redis_pool)
+
+# ============ METRICS ============
+
+# Cache effectiveness for GET /students, scraped from /metrics (hit ratio =
+# hits / (hits + misses)). `tier` is l1, redis or stale
+STUDENT_CACHE_HITS = Counter("student_cache_hits_total", "Student reads served from cache", ["endpoint", "tier"])
+STUDENT_CACHE_MISSES = Counter("student_cache_misses_total", "Student reads that went to Postgres", ["endpoint"])
+STUDENT_CACHE_OP_SECONDS = Histogram(
+    "student_cache_op_seconds", "Latency of cache lookups (get) and database loads (load)", ["op"],
+    buckets=(.0005, .001, .002, .005, .01, .025, .05, .1)
+)
+
+# Uvicorn runs several workers; with PROMETHEUS_MULTIPROC_DIR set (see the Dockerfile)
+# a scrape reports the sum across all of them, not just the worker that answered
+if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+    metrics_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(metrics_registry)
+else:
+    metrics_registry = REGISTRY
+app.mount("/metrics", make_asgi_app(registry=metrics_registry))
+
+# Tells callers (and the load test) whether a read was served from Redis
+CACHE_HIT = {"X-Cache": "HIT"}
+CACHE_MISS = {"X-Cache": "MISS"}
+CACHE_STALE = {"X-Cache": "STALE"}
+
+# Stale-while-revalidate: entries live for STUDENT_CACHE_TTL, but are only fresh for
+# STUDENT_FRESH_TTL (tracked by a student:{id}:fresh marker key). A stale hit is
+# still served immediately and refreshed in the background.
+STUDENT_CACHE_TTL = 900
+STUDENT_FRESH_TTL = 60
+
+# Negative-cache marker for missing students
+STUDENT_MISS = b"__miss__"
+STUDENT_MISS_TTL = 10
+
+# Cached JSON at least ZSTD_MIN_SIZE bytes (long completed_courses lists, the student
+# list) is stored zstd-compressed behind a one-byte ZSTD_PREFIX. JSON never starts
+# with that byte, so plain entries written before compression stay readable.
+ZSTD_MIN_SIZE = 1024
+ZSTD_PREFIX = b"\x00"
+ZSTD_COMPRESSOR = zstd.ZstdCompressor(level=3)
+ZSTD_DECOMPRESSOR = zstd.ZstdDecompressor()
+
+def pack_cached(payload: bytes) -> bytes:
+    """Encode JSON for Redis, compressing it if it is large enough to be worth it"""
+    if len(payload) < ZSTD_MIN_SIZE:
+        return payload
+    return ZSTD_PREFIX + ZSTD_COMPRESSOR.compress(payload)
+
+def unpack_cached(value: bytes) -> bytes:
+    """Decode a value written by pack_cached back to JSON"""
+    if value.startswith(ZSTD_PREFIX):
+        return ZSTD_DECOMPRESSOR.decompress(value[1:])
+    return value
+
+# Per-worker L1 in front of Redis: student id -> JSON bytes, for fresh students only.
+# Kept small (a few MB at typical student sizes) and short-lived; writes in any worker
+# evict it everywhere through the STUDENT_INVALIDATE_CHANNEL pub/sub channel
+STUDENT_L1 = TTLCache(maxsize=int(os.getenv("STUDENT_L1_SIZE", "10000")), ttl=30)
+STUDENT_INVALIDATE_CHANNEL = "student:invalidate"
+
+# Held by the worker warming the cache at startup (expires so a later restart warms again)
+WARM_CACHE_LOCK = "students:warm"
+WARM_CACHE_LOCK_TTL = 60
 
 @app.on_event("startup")
-def on_startup():
-    SQLModel.metadata.create_all(engine)
-
-def get_session():
-    with Session(engine) as session:
+async def on_startup():
+    async with engine.begin() as conn:
+        # Workers start together; the advisory lock stops them racing to create the tables
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("SELECT pg_advisory_xact_lock(8002)"))
+        await conn.run_sync(SQLModel.metadata.create_all)
+    # Preload students so the first enrollment wave hits Redis (off unless WARM_CACHE=1).
+    # Only the first worker to take the Redis lock warms; the rest would just repeat it
+    if os.getenv("WARM_CACHE") == "1" and await redis_client.set(WARM_CACHE_LOCK, b"1", nx=True, ex=WARM_CACHE_LOCK_TTL):
+        await warm_student_cache(int(os.getenv("WARM_CACHE_SIZE", "1000")))
+    app.state.invalidation_listener = asyncio.create_task(listen_for_invalidations())
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    app.state.invalidation_listener.cancel()
+    await redis_pool.disconnect()
+    await engine.dispose()
+
+async def get_session():
+    async with async_session() as session:
         yield session
 
+# Bump the version if the cached list format changes
+STUDENTS_LIST_KEY = "students:list:v1"
+STUDENTS_LIST_TTL = 30
+
+def queue_completed_courses(pipe, student: Student):
+    """
+    Queue a resync of student:{id}:completed, a Redis set mirroring completed_courses
+
+    The Enrollment Service reads it for prerequisite checks (SMEMBERS instead of
+    fetching and parsing the student). Redis can't store an empty set, so a
+    student with no completed courses has no key and enrollment falls back to HTTP.
+    """
+    key = f"student:{student.id}:completed"
+    pipe.delete(key)
+    if student.completed_courses:
+        pipe.sadd(key, *student.completed_courses)
+        pipe.expire(key, STUDENT_CACHE_TTL)
+
+def queue_student_cache(pipe, student: Student, payload: bytes):
+    """Queue a student's cache entry, freshness marker and completed-courses set"""
+    pipe.setex(f"student:{student.id}", STUDENT_CACHE_TTL, pack_cached(payload))
+    pipe.setex(f"student:{student.id}:fresh", STUDENT_FRESH_TTL, b"1")
+    queue_completed_courses(pipe, student)
+
+async def invalidate_student_cache(student_id: int, student: Optional[Student] = None):
+    """
+    Drop a student's cache entries and the cached student list in one round trip
+
+    Pass the written student to resync its completed-courses set instead of dropping it.
+    """
+    # Runs after the commit, never alongside it: invalidating before the commit lands
+    # would let a concurrent read re-cache the old row
+    STUDENT_L1.pop(student_id, None)
+    # A load already in flight may have read the old row; later reads start a fresh one
+    _inflight_loads.pop(student_id, None)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.delete(f"student:{student_id}", f"student:{student_id}:fresh", f"student:{student_id}:completed")
+    pipe.delete(STUDENTS_LIST_KEY)
+    if student is not None:
+        queue_completed_courses(pipe, student)
+    # Evict the L1 copies held by the other workers and replicas
+    pipe.publish(STUDENT_INVALIDATE_CHANNEL, student_id)
+    await pipe.execute()
+
+async def listen_for_invalidations():
+    """
+    Evict students from this worker's L1 as invalidations are published
+
+    Runs for the life of the worker. If the subscription drops, invalidations may
+    have been missed, so the whole L1 is cleared before resubscribing.
+    """
+    while True:
+        try:
+            async with redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(STUDENT_INVALIDATE_CHANNEL)
+                async for message in pubsub.listen():
+                    STUDENT_L1.pop(int(message["data"]), None)
+        except RedisError as e:
+            print(f"Lost student invalidation channel: {e}")
+        STUDENT_L1.clear()
+        await asyncio.sleep(1)
+
+async def warm_student_cache(limit: int):
+    """Cache the `limit` newest students in one pipeline"""
+    async with async_session() as session:
+        result = await session.exec(select(Student).order_by(Student.id.desc()).limit(limit))
+        students = result.all()
+
+    pipe = redis_client.pipeline(transaction=False)
+    for student in students:
+        queue_student_cache(pipe, student, STUDENT_ADAPTER.dump_json(student))
+    await pipe.execute()
+    print(f"Warmed student cache with {len(students)} students")
+
+# Cache misses being loaded right now, by student id (per process)
+_inflight_loads: Dict[int, asyncio.Future] = {}
+
+async def load_student(student_id: int) -> Optional[bytes]:
+    """Read a student from Postgres and cache it; returns the JSON bytes, or None if missing"""
+    async with async_session() as session:
+        student = await session.get(Student, student_id)
+    if not student:
+        # Drop any leftover completed-courses set too, or prerequisite checks would still see it
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.setex(f"student:{student_id}", STUDENT_MISS_TTL, STUDENT_MISS)
+        pipe.delete(f"student:{student_id}:completed")
+        await pipe.execute()
+        return None
+
+    # Serialize once, store in Redis cache along with its freshness marker
+    payload = STUDENT_ADAPTER.dump_json(student)
+    pipe = redis_client.pipeline(transaction=False)
+    queue_student_cache(pipe, student, payload)
+    await pipe.execute()
+    STUDENT_L1[student_id] = payload
+    return payload
+
+async def load_student_once(student_id: int) -> Optional[bytes]:
+    """
+    Singleflight wrapper around load_student
+
+    Concurrent misses for the same student (cold cache, right after an
+    invalidation) await one shared load instead of each querying Postgres.
+    The load is shielded so a disconnecting client doesn't cancel it for
+    the others.
+    """
+    future = _inflight_loads.get(student_id)
+    if future is None:
+        future = asyncio.ensure_future(load_student(student_id))
+        _inflight_loads[student_id] = future
+        future.add_done_callback(lambda done: _forget_load(student_id, done))
+    return await asyncio.shield(future)
+
+def _forget_load(student_id: int, future: asyncio.Future):
+    """Drop a finished load, unless an invalidation already replaced it with a newer one"""
+    if _inflight_loads.get(student_id) is future:
+        del _inflight_loads[student_id]
+
 # ============ PYDANTIC MODELS ============
 
 class StudentUpdate(BaseModel):
@@ -40,49 +268,105 @@ def health_check():
     return {"status": "healthy", "service": "students"}
 
 
-@app.get("/students", response_model=List[Student])
-def list_students(session: Session = Depends(get_session)):
+@app.get("/students", responses={200: {"model": List[Student]}})
+async def list_students(session: AsyncSession = Depends(get_session)):
     """
-    GET /students - List all students
+    GET /students - List all students (CACHED)
     Returns: Array of all students
-    """
-    students = session.exec(select(Student)).all()
-    return students
 
+    Cached for 30 seconds and invalidated on every create/update/delete.
+    Hits return the stored JSON as-is (no response_model re-serialization).
 
-@app.get("/students/{student_id}", response_model=Student)
-def get_student(student_id: int, session: Session = Depends(get_session)):
+    On a miss the list is rebuilt from the per-student cache entries: only the
+    ids come from Postgres, the entries are fetched in one MGET, and just the
+    students missing from Redis are loaded (and cached) from the database.
+    """
+    with STUDENT_CACHE_OP_SECONDS.labels("get").time():
+        cached_data = await redis_client.get(STUDENTS_LIST_KEY)
+    if cached_data:
+        STUDENT_CACHE_HITS.labels("list_students", "redis").inc()
+        return Response(content=unpack_cached(cached_data), media_type="application/json", headers=CACHE_HIT)
+    STUDENT_CACHE_MISSES.labels("list_students").inc()
+
+    ids = (await session.exec(select(Student.id))).all()
+    cached = await redis_client.mget([f"student:{i}" for i in ids]) if ids else []
+    entries = {i: unpack_cached(raw) for i, raw in zip(ids, cached) if raw and raw != STUDENT_MISS}
+
+    # Hydrate the cache misses in one query and one pipeline
+    missing = [i for i in ids if i not in entries]
+    if missing:
+        result = await session.exec(select(Student).where(Student.id.in_(missing)))
+        pipe = redis_client.pipeline(transaction=False)
+        for student in result.all():
+            entries[student.id] = STUDENT_ADAPTER.dump_json(student)
+            queue_student_cache(pipe, student, entries[student.id])
+        await pipe.execute()
+
+    # Entries are JSON objects, so the list is just their concatenation
+    payload = b"[" + b",".join(entries[i] for i in ids if i in entries) + b"]"
+    await redis_client.setex(STUDENTS_LIST_KEY, STUDENTS_LIST_TTL, pack_cached(payload))
+    return Response(content=payload, media_type="application/json", headers=CACHE_MISS)
+
+
+@app.get("/students/{student_id}", responses={200: {"model": Student}})
+async def get_student(student_id: int, background_tasks: BackgroundTasks):
     """
     GET /students/{student_id} - Get student details (CACHED)
 
     Cache-Aside Pattern:
-    1. Check Redis cache first
-    2. If cache miss, query database
-    3. Store result in cache (TTL: 300 seconds)
+    1. Check this worker's in-memory L1 (TTL: 30 seconds), then Redis - a stale
+       Redis entry (older than 60 seconds) is still returned right away, and
+       refreshed from the database in the background
+    2. If cache miss, query database (concurrent misses share one query)
+    3. Store result in L1 and Redis (TTL: 900 seconds; missing students: 10 seconds)
     4. Return student
 
     Why cache?
     - Every enrollment checks student's completed_courses
     - High read volume during registration
     - completed_courses rarely changes (only when course is completed)
+
+    Hits return the cached JSON bytes as-is.
     """
-    # Try to get from Redis cache first
-    cached_data = redis_client.get(f"student:{student_id}")
+    # In-process L1 first: no Redis round trip
+    cached_data = STUDENT_L1.get(student_id)
+    if cached_data:
+        STUDENT_CACHE_HITS.labels("get_student", "l1").inc()
+        return Response(content=cached_data, media_type="application/json", headers=CACHE_HIT)
+
+    # Then Redis (entry and freshness marker in one round trip)
+    with STUDENT_CACHE_OP_SECONDS.labels("get").time():
+        cached_data, fresh = await redis_client.mget(f"student:{student_id}", f"student:{student_id}:fresh")
+    if cached_data == STUDENT_MISS:
+        STUDENT_CACHE_HITS.labels("get_student", "redis").inc()
+        raise HTTPException(status_code=404, detail="Student not found")
     if cached_data:
-        return json.loads(cached_data)
+        cached_data = unpack_cached(cached_data)
+        if fresh:
+            STUDENT_CACHE_HITS.labels("get_student", "redis").inc()
+            STUDENT_L1[student_id] = cached_data
+            return Response(content=cached_data, media_type="application/json", headers=CACHE_HIT)
+        # Serve stale now; the refresh runs after the response is sent
+        STUDENT_CACHE_HITS.labels("get_student", "stale").inc()
+        background_tasks.add_task(load_student_once, student_id)
+        return Response(content=cached_data, media_type="application/json", headers=CACHE_STALE)
 
     # Cache miss - query database
-    student = session.get(Student, student_id)
-    if not student:
+    STUDENT_CACHE_MISSES.labels("get_student").inc()
+    with STUDENT_CACHE_OP_SECONDS.labels("load").time():
+        payload = await load_student_once(student_id)
+    if payload is None:
         raise HTTPException(status_code=404, detail="Student not found")
 
-    # Store in Redis cache with 300 second TTL
-    redis_client.setex(f"student:{student_id}", 300, json.dumps(student.dict()))
-    return student
+    return Response(content=payload, media_type="application/json", headers=CACHE_MISS)
 
 
-@app.post("/students", response_model=Student, status_code=201)
-def create_student(student: Student, session: Session = Depends(get_session)):
+@app.post("/students", status_code=201, responses={201: {"model": Student}})
+async def create_student(
+    student: Student,
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_session)
+):
     """
     POST /students - Create a new student
 
@@ -93,18 +377,30 @@ def create_student(student: Student, session: Session = Depends(get_session)):
     }
 
     Returns: Created student with assigned ID
+
+    The new student's cache entry is warmed after the response is sent.
+    The body is validated on the way in; the committed row is trusted and
+    serialized directly (no response_model re-validation).
     """
     session.add(student)
-    session.commit()
-    session.refresh(student)
-    return student
+    await session.commit()
+    await session.refresh(student)
+
+    # Drop any not-found marker cached for this id, publish completed courses
+    await invalidate_student_cache(student.id, student)
+    # Warm the cache entry off the request path. A fresh load, not the singleflight:
+    # a load already in flight may have read the row before this write committed
+    background_tasks.add_task(load_student, student.id)
 
+    return Response(content=STUDENT_ADAPTER.dump_json(student), media_type="application/json", status_code=201)
 
-@app.put("/students/{student_id}", response_model=Student)
-def update_student(
+
+@app.put("/students/{student_id}", responses={200: {"model": Student}})
+async def update_student(
     student_id: int,
     student_update: StudentUpdate,
-    session: Session = Depends(get_session)
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_session)
 ):
     """
     PUT /students/{student_id} - Update student details (partial updates supported)
@@ -114,43 +410,48 @@ def update_student(
     - Update student name
 
     All fields are optional - only provided fields will be updated.
+    The returned row comes from Postgres and is serialized without re-validation.
 
-    IMPORTANT: Invalidate cache after update
+    IMPORTANT: Invalidate cache after update (the entry is re-warmed after the response)
     """
-    student = session.get(Student, student_id)
+    # Update only provided fields, in a single UPDATE ... RETURNING (no SELECT first)
+    update_data = student_update.dict(exclude_unset=True)
+    if not update_data:
+        student = await session.get(Student, student_id)
+    else:
+        result = await session.exec(
+            update(Student)
+            .where(Student.id == student_id)
+            .values(**update_data)
+            .returning(Student)
+        )
+        student = result.scalar_one_or_none()
+        await session.commit()
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
-    # Update only provided fields
-    update_data = student_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(student, field, value)
+    # Invalidate cache, resync completed courses
+    await invalidate_student_cache(student_id, student)
+    # Re-warm off the request path with a fresh load (see create_student)
+    background_tasks.add_task(load_student, student_id)
 
-    session.add(student)
-    session.commit()
-    session.refresh(student)
-
-    # Invalidate cache
-    redis_client.delete(f"student:{student_id}")
-
-    return student
+    return Response(content=STUDENT_ADAPTER.dump_json(student), media_type="application/json")
 
 
 @app.delete("/students/{student_id}", status_code=204)
-def delete_student(student_id: int, session: Session = Depends(get_session)):
+async def delete_student(student_id: int, session: AsyncSession = Depends(get_session)):
     """
     DELETE /students/{student_id} - Delete a student
 
     IMPORTANT: Invalidate cache after deletion
     """
-    student = session.get(Student, student_id)
-    if not student:
+    # Single DELETE; the row count tells us whether the student existed
+    result = await session.exec(delete(Student).where(Student.id == student_id))
+    await session.commit()
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Student not found")
 
-    session.delete(student)
-    session.commit()
-
     # Invalidate cache
-    redis_client.delete(f"student:{student_id}")
+    await invalidate_student_cache(student_id)
 
     return None
\ No newline at end of file
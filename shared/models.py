@@ -1,22 +1,43 @@
 from sqlmodel import SQLModel, Field, Column
 from typing import Optional, List
 import json
-from sqlalchemy import JSON
+from sqlalchemy import JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
+
+# Course-code lists are JSONB on Postgres (stored pre-parsed, not re-parsed on every
+# read); other databases keep plain JSON. Nothing queries inside them - prerequisite
+# checks run against the Redis completed-courses set - so they aren't indexed.
+# create_all doesn't alter existing tables; reset the volumes or run per table:
+#   ALTER TABLE student ALTER COLUMN completed_courses TYPE jsonb USING completed_courses::jsonb;
+# and drop the GIN indexes earlier versions created:
+#   DROP INDEX IF EXISTS ix_student_completed_courses_gin, ix_course_prerequisites_gin;
+CourseCodes = JSON().with_variant(JSONB(), "postgresql")
 
 class Student(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
-    completed_courses: List[str] = Field(default=[], sa_column=Column(JSON))
+    completed_courses: List[str] = Field(default=[], sa_column=Column(CourseCodes))
 
 class Course(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
-    code: str
+    code: str = Field(index=True)
     capacity: int
     enrolled: int = 0
-    prerequisites: List[str] = Field(default=[], sa_column=Column(JSON))
+    prerequisites: List[str] = Field(default=[], sa_column=Column(CourseCodes))
 
 class Enrollment(SQLModel, table=True):
+    __table_args__ = (
+        # Makes (student, course) pairs unique - a student can't hold two seats in one course.
+        # Leads with student_id and INCLUDEs id, so "enrollments for a student" is an
+        # index-only scan (no separate student_id index needed)
+        Index(
+            "ix_enrollment_student_course", "student_id", "course_id",
+            unique=True, postgresql_include=["id"]
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     student_id: int
-    course_id: int
\ No newline at end of file
+    # student_id lookups use ix_enrollment_student_course; per-course scans need their own index
+    course_id: int = Field(index=True)
\ No newline at end of file